@@ -1,7 +1,34 @@
 import streamlit as st
 import numpy as np
 import math
-import pandas as pd
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# ================================
+# Lectura de datos de calibración
+# ================================
+
+@st.cache_data(show_spinner=False)
+def _parsear_pares(texto, min_filas=1):
+    """
+    Convierte el texto ingresado (una línea por dato, dos valores separados por coma)
+    en un arreglo de forma (N, 2). Lanza ValueError, siempre con uno de los mensajes
+    de esta función, si el formato no es válido.
+    """
+    mensaje_formato = "Cada línea debe contener dos valores separados por coma."
+    lineas = [linea for linea in texto.splitlines() if linea.strip()]
+    if any(linea.count(',') != 1 for linea in lineas):
+        raise ValueError(mensaje_formato)
+    try:
+        valores = np.array(','.join(lineas).split(','), dtype=np.float64)
+    except ValueError:
+        raise ValueError(mensaje_formato) from None
+    if len(lineas) < min_filas:
+        raise ValueError(f"Debe ingresar al menos {min_filas} pares de datos.")
+    return valores.reshape(-1, 2)
 
 # ================================
 # Funciones para el enfoque metrológico
@@ -16,6 +43,7 @@ def calcular_tolerancia_sensor(rango_min, rango_max, sensor_type, tolerancia_sen
     else:
         return tolerancia_sensor_input if tolerancia_sensor_input is not None else 0.5
 
+@st.cache_data(show_spinner=False)
 def calcular_tolerancia_metrologica(errores, incertidumbre_patron, rango_calibrado,
                                     tolerancia_transmisor, tolerancia_plc, tolerancia_pantalla,
                                     sensor_type, tolerancia_sensor_input=None, unidad=""):
@@ -26,7 +54,7 @@ def calcular_tolerancia_metrologica(errores, incertidumbre_patron, rango_calibra
       - La combinación en cuadratura de las tolerancias de todos los componentes.
     """
     desviacion_estandar = np.std(errores, ddof=1)
-    incertidumbre_combinada = math.sqrt(desviacion_estandar**2 + incertidumbre_patron**2)
+    incertidumbre_combinada = math.hypot(desviacion_estandar, incertidumbre_patron)
     incertidumbre_expandida = 2 * incertidumbre_combinada
     tolerancia_estricta = incertidumbre_expandida
     tolerancia_practica = round(incertidumbre_expandida + 0.05, 2)
@@ -39,11 +67,11 @@ def calcular_tolerancia_metrologica(errores, incertidumbre_patron, rango_calibra
     tolerancia_sensor = calcular_tolerancia_sensor(rango_min, rango_max, sensor_type, tolerancia_sensor_input)
     
     # Combinación en cuadratura de todas las tolerancias
-    tolerancia_total = math.sqrt(
-        tolerancia_sensor**2 +
-        tolerancia_transmisor**2 +
-        tolerancia_plc**2 +
-        tolerancia_pantalla**2
+    tolerancia_total = math.hypot(
+        tolerancia_sensor,
+        tolerancia_transmisor,
+        tolerancia_plc,
+        tolerancia_pantalla
     )
     
     return {
@@ -57,105 +85,148 @@ def calcular_tolerancia_metrologica(errores, incertidumbre_patron, rango_calibra
 # Clase para el cálculo normativo (Caso B)
 # ================================
 class SensorCalibrationAnalyzer:
+    PARAMETROS_NORMATIVOS = {
+        'temperatura': {
+            'clase_precision': {'alta': 0.1, 'estandar': 0.5, 'baja': 1.0},
+            'factor_base_tolerancia': 0.15,
+            'factor_compensacion': 0.0020
+        },
+        'presion': {
+            'clase_precision': {'alta': 0.1, 'estandar': 0.5, 'baja': 1.0},
+            'factor_base_tolerancia': 0.20,
+            'factor_compensacion': 0.0025
+        },
+        'caudal': {
+            'clase_precision': {'alta': 0.2, 'estandar': 0.5, 'baja': 1.0},
+            'factor_base_tolerancia': 0.25,
+            'factor_compensacion': 0.0030
+        },
+        'velocidad': {
+            'clase_precision': {'alta': 0.1, 'estandar': 0.5, 'baja': 1.0},
+            'factor_base_tolerancia': 0.18,
+            'factor_compensacion': 0.0015
+        }
+    }
+
     def __init__(self, tipo_sensor, unidades):
         self.tipo_sensor = tipo_sensor
         self.unidades = unidades
-        self.parametros_normativos = {
-            'temperatura': {
-                'clase_precision': {'alta': 0.1, 'estandar': 0.5, 'baja': 1.0},
-                'factor_base_tolerancia': 0.15,
-                'factor_compensacion': 0.0020
-            },
-            'presion': {
-                'clase_precision': {'alta': 0.1, 'estandar': 0.5, 'baja': 1.0},
-                'factor_base_tolerancia': 0.20,
-                'factor_compensacion': 0.0025
-            },
-            'caudal': {
-                'clase_precision': {'alta': 0.2, 'estandar': 0.5, 'baja': 1.0},
-                'factor_base_tolerancia': 0.25,
-                'factor_compensacion': 0.0030
-            },
-            'velocidad': {
-                'clase_precision': {'alta': 0.1, 'estandar': 0.5, 'baja': 1.0},
-                'factor_base_tolerancia': 0.18,
-                'factor_compensacion': 0.0015
-            }
-        }
     
-    def calcular_tolerancia_transmision(self, rango_calibrado, datos_calibracion, clase_precision='estandar', mostrar_detalles=False):
-        if datos_calibracion.empty:
-            raise ValueError("No se proporcionaron datos de calibración")
-        
-        puntos_calibracion = datos_calibracion['valor_medido']
-        errores = datos_calibracion['error']
-        error_medio = np.mean(errores)
-        error_maximo = np.max(np.abs(errores))
-        desviacion_estandar = np.std(errores)
-        
-        params = self.parametros_normativos.get(self.tipo_sensor, self.parametros_normativos['temperatura'])
-        rango_min, rango_max = rango_calibrado
-        rango_medicion = rango_max - rango_min
-        
-        precision_base = params['clase_precision'].get(clase_precision, 0.5)
-        factor_base = params['factor_base_tolerancia']
-        factor_compensacion = params['factor_compensacion'] * max(abs(rango_min), abs(rango_max))
-        tolerancia_transmision = factor_base + factor_compensacion
-        
-        error_maximo_permitido_porcentual = precision_base
-        error_maximo_permitido_unidades = (error_maximo_permitido_porcentual / 100) * rango_medicion
-        porcentaje_tolerancia = (tolerancia_transmision / rango_medicion) * 100
-        incertidumbre_combinada = math.sqrt(desviacion_estandar**2)
-        incertidumbre_expandida = 2 * incertidumbre_combinada
-        
-        resultados = {
-            'Tipo de sensor': self.tipo_sensor,
-            'Unidades': self.unidades,
-            'Rango calibrado': f"{rango_min} - {rango_max} {self.unidades}",
-            'Clase de precisión': clase_precision,
+    def calcular_tolerancia_transmision(self, rango_calibrado, valores_medidos, errores, clase_precision='estandar', mostrar_detalles=False):
+        params = self.PARAMETROS_NORMATIVOS.get(self.tipo_sensor, self.PARAMETROS_NORMATIVOS['temperatura'])
+        return _calcular_tolerancia_transmision(
+            self.tipo_sensor, self.unidades, params, rango_calibrado, valores_medidos, errores,
+            clase_precision, mostrar_detalles
+        )
+
+# Se calcula a nivel de módulo porque st.cache_data no memoriza bien métodos ligados.
+@st.cache_data(show_spinner=False)
+def _calcular_tolerancia_transmision(tipo_sensor, unidades, params, rango_calibrado, valores_medidos, errores,
+                                     clase_precision, mostrar_detalles):
+    if errores.size == 0:
+        raise ValueError("No se proporcionaron datos de calibración")
+
+    error_absoluto = np.abs(errores)
+    error_medio = errores.mean()
+    error_maximo = error_absoluto.max()
+    desviacion_estandar = errores.std()
+
+    rango_min, rango_max = rango_calibrado
+    rango_medicion = rango_max - rango_min
+
+    precision_base = params['clase_precision'].get(clase_precision, 0.5)
+    factor_base = params['factor_base_tolerancia']
+    factor_compensacion = params['factor_compensacion'] * max(abs(rango_min), abs(rango_max))
+    tolerancia_transmision = factor_base + factor_compensacion
+
+    error_maximo_permitido_porcentual = precision_base
+    error_maximo_permitido_unidades = (error_maximo_permitido_porcentual / 100) * rango_medicion
+    porcentaje_tolerancia = (tolerancia_transmision / rango_medicion) * 100
+    incertidumbre_combinada = abs(desviacion_estandar)
+    incertidumbre_expandida = 2 * incertidumbre_combinada
+
+    resultados = {
+        'Tipo de sensor': tipo_sensor,
+        'Unidades': unidades,
+        'Rango calibrado': f"{rango_min} - {rango_max} {unidades}",
+        'Clase de precisión': clase_precision,
+        'Error medio': round(error_medio, 4),
+        'Error máximo medido': round(error_maximo, 4),
+        'Error máximo permitido (%)': round(error_maximo_permitido_porcentual, 2),
+        'Error máximo permitido (unidades)': round(error_maximo_permitido_unidades, 4),
+        'Desviación estándar': round(desviacion_estandar, 4),
+        'Tolerancia de transmisión': round(tolerancia_transmision, 4),
+        'Porcentaje de tolerancia': round(porcentaje_tolerancia, 2),
+        'Incertidumbre combinada': round(incertidumbre_combinada, 4),
+        'Incertidumbre expandida': round(incertidumbre_expandida, 4)
+    }
+
+    if mostrar_detalles:
+        detalles = {
+            'Puntos de calibración': list(valores_medidos),
+            'Errores': list(errores),
             'Error medio': round(error_medio, 4),
-            'Error máximo medido': round(error_maximo, 4),
-            'Error máximo permitido (%)': round(error_maximo_permitido_porcentual, 2),
-            'Error máximo permitido (unidades)': round(error_maximo_permitido_unidades, 4),
+            'Error máximo': round(error_maximo, 4),
             'Desviación estándar': round(desviacion_estandar, 4),
-            'Tolerancia de transmisión': round(tolerancia_transmision, 4),
-            'Porcentaje de tolerancia': round(porcentaje_tolerancia, 2),
-            'Incertidumbre combinada': round(incertidumbre_combinada, 4),
-            'Incertidumbre expandida': round(incertidumbre_expandida, 4)
+            'Precisión base': precision_base,
+            'Factor base': factor_base,
+            'Factor compensación': factor_compensacion,
+            'Rango de medición': rango_medicion,
+            'Error máximo permitido (unidades)': round(error_maximo_permitido_unidades, 4),
+            'Porcentaje de tolerancia': round(porcentaje_tolerancia, 2)
         }
-        
-        if mostrar_detalles:
-            detalles = {
-                'Puntos de calibración': list(puntos_calibracion),
-                'Errores': list(errores),
-                'Error medio': round(error_medio, 4),
-                'Error máximo': round(error_maximo, 4),
-                'Desviación estándar': round(desviacion_estandar, 4),
-                'Precisión base': precision_base,
-                'Factor base': factor_base,
-                'Factor compensación': factor_compensacion,
-                'Rango de medición': rango_medicion,
-                'Error máximo permitido (unidades)': round(error_maximo_permitido_unidades, 4),
-                'Porcentaje de tolerancia': round(porcentaje_tolerancia, 2)
-            }
-            resultados['Detalles'] = detalles
-        
-        return resultados
+        resultados['Detalles'] = detalles
+
+    return resultados
 
 # ================================
 # Función para calibración por comparación (Caso C)
 # ================================
-def calibracion_por_comparacion(df):
+# Solo se usa si numba está instalado; sin numba se emplean las reducciones de NumPy.
+if numba is not None:
+    def _estadisticas_una_pasada(valor_equipo, valor_referencia):
+        """
+        Recorre los pares una sola vez (recurrencia de Welford) y devuelve
+        (error medio, error máximo absoluto, desviación estándar muestral).
+        """
+        n = valor_equipo.shape[0]
+        media = 0.0
+        m2 = 0.0
+        maximo_abs = 0.0
+        for i in range(n):
+            dato = valor_equipo[i] - valor_referencia[i]
+            delta = dato - media
+            media += delta / (i + 1)
+            m2 += (dato - media) * delta
+            # Negado, y sin sobrescribir un NaN previo, para que un NaN se propague igual que en np.max.
+            if not math.isnan(maximo_abs) and not (abs(dato) <= maximo_abs):
+                maximo_abs = abs(dato)
+        desviacion = math.sqrt(m2 / (n - 1)) if n > 1 else math.nan
+        return media, maximo_abs, desviacion
+
+    # Streamlit re-ejecuta el script en cada interacción; st.cache_resource conserva
+    # el mismo dispatcher compilado entre ejecuciones en lugar de recrearlo.
+    @st.cache_resource(show_spinner=False)
+    def _estadisticas_una_pasada_jit():
+        return numba.njit(cache=True)(_estadisticas_una_pasada)
+
+@st.cache_data(show_spinner=False)
+def calibracion_por_comparacion(valor_equipo, valor_referencia):
     """
     En calibración por comparación se ingresa 10 pares:
-      - 'valor_equipo': medida del equipo.
-      - 'valor_referencia': medida con instrumento calibrado.
+      - valor_equipo: medidas del equipo.
+      - valor_referencia: medidas con instrumento calibrado.
     Se calcula el error (diferencia) y se extraen estadísticas.
     """
-    df["error"] = df["valor_equipo"] - df["valor_referencia"]
-    error_medio = np.mean(df["error"])
-    error_maximo = np.max(np.abs(df["error"]))
-    desviacion_estandar = np.std(df["error"], ddof=1)
+    if numba is not None:
+        error_medio, error_maximo, desviacion_estandar = _estadisticas_una_pasada_jit()(
+            valor_equipo, valor_referencia
+        )
+    else:
+        error = valor_equipo - valor_referencia
+        error_medio = np.mean(error)
+        error_maximo = np.max(np.abs(error))
+        desviacion_estandar = np.std(error, ddof=1)
     tolerancia_transmision = 2 * desviacion_estandar
     return {
         "Error medio": round(error_medio, 4),
@@ -216,22 +287,13 @@ if caso.startswith("A"):
         if not calibracion_text.strip():
             st.error("Por favor, ingrese los datos de calibración.")
         else:
-            datos = []
-            for linea in calibracion_text.splitlines():
-                linea = linea.strip()
-                if linea:
-                    partes = linea.split(',')
-                    if len(partes) != 2:
-                        st.error("Cada línea debe contener dos valores separados por coma.")
-                        break
-                    valor_medido, error = map(float, partes)
-                    datos.append({'valor_medido': valor_medido, 'error': error})
-            if not datos:
-                st.error("No se procesaron datos válidos.")
+            try:
+                datos = _parsear_pares(calibracion_text)
+            except ValueError as e:
+                st.error(str(e))
             else:
-                df_calibracion = pd.DataFrame(datos)
                 resultados = calcular_tolerancia_metrologica(
-                    errores=df_calibracion['error'].to_numpy(),
+                    errores=datos[:, 1],
                     incertidumbre_patron=incertidumbre_patron,
                     rango_calibrado=(rango_min, rango_max),
                     tolerancia_transmisor=tolerancia_transmisor,
@@ -261,23 +323,14 @@ elif caso.startswith("B"):
         if not calibracion_text.strip():
             st.error("Por favor, ingrese los datos de calibración.")
         else:
-            datos = []
-            for linea in calibracion_text.splitlines():
-                linea = linea.strip()
-                if linea:
-                    partes = linea.split(',')
-                    if len(partes) != 2:
-                        st.error("Cada línea debe contener dos valores separados por coma.")
-                        break
-                    valor_medido, error = map(float, partes)
-                    datos.append({'valor_medido': valor_medido, 'error': error})
-            if not datos:
-                st.error("No se procesaron datos válidos.")
+            try:
+                datos = _parsear_pares(calibracion_text)
+            except ValueError as e:
+                st.error(str(e))
             else:
-                df_calibracion = pd.DataFrame(datos)
                 analizador = SensorCalibrationAnalyzer(sensor_type, unidad)
                 resultados = analizador.calcular_tolerancia_transmision(
-                    (rango_min, rango_max), df_calibracion, clase_precision, mostrar_detalles=False
+                    (rango_min, rango_max), datos[:, 0], datos[:, 1], clase_precision, mostrar_detalles=False
                 )
                 st.subheader("Resultados Normativos (Caso B)")
                 for clave, valor in resultados.items():
@@ -297,21 +350,14 @@ elif caso.startswith("C"):
         if not comparacion_text.strip():
             st.error("Por favor, ingrese los datos de comparación.")
         else:
-            datos = []
-            for linea in comparacion_text.splitlines():
-                linea = linea.strip()
-                if linea:
-                    partes = linea.split(',')
-                    if len(partes) != 2:
-                        st.error("Cada línea debe contener dos valores separados por coma.")
-                        break
-                    valor_equipo, valor_referencia = map(float, partes)
-                    datos.append({'valor_equipo': valor_equipo, 'valor_referencia': valor_referencia})
-            if len(datos) < 10:
-                st.error("Debe ingresar al menos 10 pares de datos.")
+            try:
+                datos = _parsear_pares(comparacion_text, min_filas=10)
+            except ValueError as e:
+                st.error(str(e))
             else:
-                df_comparacion = pd.DataFrame(datos)
-                resultados = calibracion_por_comparacion(df_comparacion)
+                resultados = calibracion_por_comparacion(
+                    valor_equipo=datos[:, 0], valor_referencia=datos[:, 1]
+                )
                 st.subheader("Resultados de Calibración por Comparación (Caso C)")
                 for clave, valor in resultados.items():
                     st.write(f"**{clave}**: {valor}")